@@ -1,9 +1,13 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 import pandas as pd
-from io import BytesIO
+import numpy as np
+from typing import BinaryIO
 import re
+import csv
+import codecs
 import unicodedata
 import math
 
@@ -31,65 +35,156 @@ class UploadResponse(BaseModel):
 # Regex para identificar colunas por nome
 TEMP_NAME_PAT = re.compile(r"(temp|temperatura|°c|celsius|℃|\bt\b)", re.I)
 TIME_NAME_PAT = re.compile(r"(timestamp|datahora|date_time|datetime|tempo|time|\bdata\b|\bhora\b)", re.I)
+# Tudo que não é dígito, ponto ou sinal (aplicado depois de ajustar o decimal)
+NON_NUMERIC_PAT = re.compile(r"[^0-9.\-]+")
+
+# Formatos de data/hora comuns nas exportações (dia primeiro, padrão BR)
+DATETIME_FMTS = (
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d/%m/%y %H:%M:%S",
+    "%d/%m/%y %H:%M",
+    "%d/%m/%y",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+)
+# Só para colunas de hora: apenas a hora do dia é usada na combinação
+TIME_FMTS = ("%H:%M:%S", "%H:%M")
+
+# Espaços removidos dos nomes de coluna normalizados
+WHITESPACE_TRANS = str.maketrans("", "", " \n\t\r\xa0")
 
 # --------------------- Helpers de normalização ---------------------
 def _normalize_text(txt: str) -> str:
     txt = str(txt).strip().lower()
-    txt = unicodedata.normalize("NFKD", txt)
-    txt = "".join(c for c in txt if not unicodedata.combining(c))
-    txt = txt.replace("℃", "c").replace("°c", "c")
-    txt = txt.replace(" ", "").replace("\n", "").replace("\t", "")
-    return txt
+    # Caminho rápido: cabeçalhos ASCII não têm acentos nem símbolos de unidade
+    if not txt.isascii():
+        # Quick Check (UAX #15): só decompõe se o texto ainda não estiver em NFKD
+        if not unicodedata.is_normalized("NFKD", txt):
+            txt = unicodedata.normalize("NFKD", txt)
+        txt = "".join(c for c in txt if not unicodedata.combining(c))
+        txt = txt.replace("℃", "c").replace("°c", "c")
+    return txt.translate(WHITESPACE_TRANS)
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
     df.columns = [_normalize_text(c) for c in df.columns]
     return df
 
+def _drop_empty(df: pd.DataFrame) -> pd.DataFrame:
+    # Equivale a dropna(axis=1, how="all").dropna(axis=0, how="all"),
+    # com um único isna() e uma única cópia.
+    na = df.isna().to_numpy()
+    keep_cols = ~na.all(axis=0)
+    keep_rows = ~na[:, keep_cols].all(axis=1)
+    return df.iloc[keep_rows, keep_cols]
+
 def _clean_numeric_series(s: pd.Series) -> pd.Series:
-    def _clean_cell(v):
-        if pd.isna(v):
-            return math.nan
-        txt = str(v).strip().lower()
-        for trash in ["°c", "℃", " c", "c ", " c ", "°", " celsius"]:
-            txt = txt.replace(trash, "")
-        txt = txt.replace(" ", "")
-
-        if "," in txt and "." in txt:
-            last_comma = txt.rfind(",")
-            last_dot = txt.rfind(".")
-            if last_comma > last_dot:
-                txt = txt.replace(".", "")
-                txt = txt.replace(",", ".")
+    # Colunas que o leitor já entregou como número não precisam de limpeza
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.astype(float)
+    # Caso comum primeiro: células que o pandas já converte para número
+    # dispensam a limpeza por regex; só o restante passa por ela.
+    # Uma amostra curta evita o probe em colunas de texto ("22,5 °C").
+    if pd.api.types.is_object_dtype(s) and pd.to_numeric(s.iloc[:100], errors="coerce").notna().any():
+        values = pd.to_numeric(s, errors="coerce").to_numpy(dtype=float, copy=True)
+        # ±inf e booleanos (True -> 1.0) não são leituras: voltam para a
+        # limpeza de texto, que os trata como sempre (NaN).
+        values[np.isinf(values)] = math.nan
+        maybe_bool = np.flatnonzero((values == 0.0) | (values == 1.0))
+        if len(maybe_bool):
+            raw = s.to_numpy()
+            is_bool = np.array([isinstance(raw[i], (bool, np.bool_)) for i in maybe_bool])
+            values[maybe_bool[is_bool]] = math.nan
+        pending = np.isnan(values) & s.notna().to_numpy()
+        if not pending.all():
+            probe = pd.Series(values, index=s.index, name=s.name)
+            if pending.any():
+                probe.loc[pending] = _clean_numeric_text(s[pending]).to_numpy()
+            return probe
+    return _clean_numeric_text(s)
+
+def _clean_numeric_text(s: pd.Series) -> pd.Series:
+    # Leituras se repetem muito: limpa só os valores distintos e espalha o
+    # resultado pelos códigos (código -1 = vazio -> NaN no fim do array).
+    codes, uniques = pd.factorize(s)
+    cleaned = np.array([_clean_numeric_cell(v) for v in uniques] + [math.nan], dtype=float)
+    return pd.Series(cleaned[codes], index=s.index, name=s.name)
+
+def _clean_numeric_cell(v) -> float:
+    # Unidades (°C, ℃, celsius) e espaços saem junto com o resto no
+    # NON_NUMERIC_PAT: não têm dígito, vírgula, ponto nem sinal.
+    txt = str(v)
+
+    # "1.234,5" -> vírgula decimal; "1,234.5" -> ponto decimal
+    if "," in txt:
+        if "." in txt:
+            if txt.rfind(",") > txt.rfind("."):
+                txt = txt.replace(".", "").replace(",", ".")
             else:
                 txt = txt.replace(",", "")
         else:
-            if "," in txt:
-                txt = txt.replace(",", ".")
-        txt = re.sub(r"[^0-9\.\-]+", "", txt)
-
-        if txt in ("", ".", "-", "-.", ".-"):
-            return math.nan
-        try:
-            return float(txt)
-        except Exception:
-            return math.nan
-
-    cleaned = s.map(_clean_cell)
-    return cleaned
+            txt = txt.replace(",", ".")
+    txt = NON_NUMERIC_PAT.sub("", txt)
+
+    try:
+        return float(txt)
+    except ValueError:
+        return math.nan
+
+def _detect_datetime_format(s: pd.Series, formats: tuple[str, ...]) -> str | None:
+    # Testa os formatos numa amostra pequena; com format= o pandas usa o parser
+    # vetorizado em vez de cair no dateutil célula a célula.
+    if not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+        return None
+    sample = s.iloc[:200].dropna().iloc[:10].astype(str)
+    if sample.empty:
+        return None
+    for fmt in formats:
+        ok = pd.to_datetime(sample, format=fmt, errors="coerce").notna().mean()
+        if ok >= 0.8:
+            return fmt
+    return None
+
+def _parse_datetime(s: pd.Series, formats: tuple[str, ...] = DATETIME_FMTS) -> pd.Series:
+    fmt = _detect_datetime_format(s, formats)
+    if fmt is not None:
+        return pd.to_datetime(s, format=fmt, errors="coerce")
+    return pd.to_datetime(s, errors="coerce", dayfirst=True)
 
 def _to_datetime_score(s: pd.Series) -> tuple[pd.Series, float]:
-    dt = pd.to_datetime(s, errors="coerce", dayfirst=True)
+    dt = _parse_datetime(s)
     score = float(dt.notna().mean())
     return dt, score
 
+def _parse_date_part(s: pd.Series) -> pd.Series:
+    return _parse_datetime(s)
+
+def _parse_time_part(s: pd.Series) -> pd.Series:
+    s = s.astype(str)
+    fmt = _detect_datetime_format(s, TIME_FMTS)
+    if fmt is not None:
+        return pd.to_datetime(s, format=fmt, errors="coerce")
+    return pd.to_datetime(s, errors="coerce")
+
+def _combine_date_time(d: pd.Series, h: pd.Series) -> pd.Series:
+    # Dia da coluna de data + hora do dia da coluna de hora (aritmética de timedelta)
+    return d.dt.normalize() + (h - h.dt.normalize())
+
 # --------------------- Detecção de colunas ---------------------
 def _pick_time_column(df: pd.DataFrame) -> tuple[str, str | None, pd.Series]:
     candidates = list(df.columns)
     named = [c for c in candidates if TIME_NAME_PAT.search(c)]
     scored = []
+    parsed: dict[str, pd.Series] = {}
     for c in (named or candidates):
         series, score = _to_datetime_score(df[c])
+        parsed[c] = series
         scored.append((score, c, series))
     scored.sort(reverse=True)
     best_score, best_col, best_series = scored[0]
@@ -97,12 +192,13 @@ def _pick_time_column(df: pd.DataFrame) -> tuple[str, str | None, pd.Series]:
     if best_score < 0.60:
         data_cols = [c for c in candidates if "data" in c]
         hora_cols = [c for c in candidates if any(tok in c for tok in ["hora", "time", "tempo"])]
+        # Cada coluna é interpretada uma única vez; os pares só somam data + hora
+        d_parsed = {c: parsed[c] if c in parsed else _parse_date_part(df[c]) for c in data_cols}
+        h_parsed = {c: _parse_time_part(df[c]) for c in hora_cols}
         combo_best = (0.0, None, None, None)
         for dcol in data_cols:
             for hcol in hora_cols:
-                d = pd.to_datetime(df[dcol], errors="coerce", dayfirst=True).dt.strftime("%Y-%m-%d")
-                h = pd.to_datetime(df[hcol].astype(str), errors="coerce").dt.time.astype(str)
-                ts = pd.to_datetime(d + " " + h, errors="coerce")
+                ts = _combine_date_time(d_parsed[dcol], h_parsed[hcol])
                 score = float(ts.notna().mean())
                 if score > combo_best[0]:
                     combo_best = (score, dcol, hcol, ts)
@@ -111,18 +207,29 @@ def _pick_time_column(df: pd.DataFrame) -> tuple[str, str | None, pd.Series]:
 
     return best_col, None, best_series
 
-def _column_numeric_quality(col: pd.Series) -> tuple[float, float]:
-    cleaned = _clean_numeric_series(col)
+def _column_numeric_quality(col: pd.Series, cleaned_cache: dict[str, pd.Series] | None = None) -> tuple[float, float]:
+    # Reaproveita a limpeza já feita para esta coluna (chave = nome da coluna)
+    if cleaned_cache is not None and col.name in cleaned_cache:
+        cleaned = cleaned_cache[col.name]
+    else:
+        cleaned = _clean_numeric_series(col)
+        if cleaned_cache is not None:
+            cleaned_cache[col.name] = cleaned
     pct = float(cleaned.notna().mean())
     med = float(cleaned.median()) if cleaned.notna().any() else float("nan")
     return pct, med
 
-def _pick_temp_column(df: pd.DataFrame) -> str:
-    candidates = list(df.columns)
+def _pick_temp_column(
+    df: pd.DataFrame,
+    cleaned_cache: dict[str, pd.Series] | None = None,
+    exclude: tuple[str | None, ...] = (),
+) -> str:
+    # Colunas de tempo já escolhidas nunca são a temperatura
+    candidates = [c for c in df.columns if c not in exclude] or list(df.columns)
     scored = []
     for c in candidates:
         name_score = 1.0 if TEMP_NAME_PAT.search(c) else 0.0
-        pct_num, median_val = _column_numeric_quality(df[c])
+        pct_num, median_val = _column_numeric_quality(df[c], cleaned_cache)
         plaus = 1.0 if (not math.isnan(median_val) and -50.0 <= median_val <= 100.0) else 0.0
         score = name_score * 2.0 + pct_num * 1.5 + plaus * 2.5
         scored.append((score, name_score, pct_num, plaus, c, median_val))
@@ -132,13 +239,53 @@ def _pick_temp_column(df: pd.DataFrame) -> str:
     return col
 
 # --------------------- Leitura ---------------------
-def _read_any_excel(content: bytes, filename: str) -> pd.DataFrame:
+CSV_SAMPLE_SIZE = 64 * 1024
+CSV_SEPARATORS = (",", ";", "\t", "|")
+CSV_ENCODINGS = ("utf-8", "latin-1", "cp1252")
+CSV_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+def _sniff_csv(sample: bytes) -> tuple[str, str]:
+    enc = next((e for bom, e in CSV_BOMS if sample.startswith(bom)), None)
+    if enc is None:
+        try:
+            # final=False tolera um caractere multibyte cortado no fim da amostra
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            enc = "utf-8"
+        except UnicodeDecodeError:
+            enc = "latin-1"
+    text = codecs.getincrementaldecoder(enc)(errors="ignore").decode(sample, final=False)
+    sep = csv.Sniffer().sniff(text, delimiters="".join(CSV_SEPARATORS)).delimiter
+    return sep, enc
+
+def _read_excel_fast(bio: BinaryIO, fallback_engine: str | None) -> pd.DataFrame:
+    # calamine (Rust) lê .xlsx e .xls bem mais rápido que openpyxl/xlrd;
+    # sem python-calamine instalado, volta ao engine anterior.
+    try:
+        return pd.read_excel(bio, engine="calamine")
+    except ImportError:
+        bio.seek(0)
+        return pd.read_excel(bio, engine=fallback_engine)
+
+def _read_any_excel(bio: BinaryIO, filename: str) -> pd.DataFrame:
     name = filename.lower()
-    bio = BytesIO(content)
+    bio.seek(0)
 
     if name.endswith(".csv"):
-        for sep in [",", ";", "\t", "|"]:
-            for enc in ["utf-8", "latin-1", "cp1252"]:
+        # Caminho rápido: detecta encoding/separador numa amostra e faz uma única leitura
+        try:
+            sep, enc = _sniff_csv(bio.read(CSV_SAMPLE_SIZE))
+            bio.seek(0)
+            df = pd.read_csv(bio, sep=sep, encoding=enc, engine="c")
+            if df.shape[1] >= 2:
+                return df
+        except Exception:
+            pass
+        for sep in CSV_SEPARATORS:
+            for enc in CSV_ENCODINGS:
                 try:
                     bio.seek(0)
                     df = pd.read_csv(bio, sep=sep, encoding=enc, engine="python")
@@ -148,43 +295,95 @@ def _read_any_excel(content: bytes, filename: str) -> pd.DataFrame:
                     pass
         raise HTTPException(status_code=400, detail="Não consegui ler o CSV. Verifique o separador/encoding.")
     elif name.endswith(".xlsx"):
-        return pd.read_excel(bio, engine="openpyxl")
+        return _read_excel_fast(bio, fallback_engine="openpyxl")
     elif name.endswith(".xls"):
-        return pd.read_excel(bio, engine="xlrd")
+        return _read_excel_fast(bio, fallback_engine="xlrd")
     else:
-        return pd.read_excel(bio)
+        return _read_excel_fast(bio, fallback_engine=None)
 
 def _final_sanity_trim(temp: pd.Series) -> pd.Series:
     temp = temp.where(~(temp > 1000), other=pd.NA)
     temp = temp.where(~(temp < -100), other=pd.NA)
     return temp
 
+def _format_utc_offset(seconds: int) -> str:
+    sign = "+" if seconds >= 0 else "-"
+    seconds = abs(seconds)
+    return f"{sign}{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+def _iso_strings(ts: pd.Series) -> list[str]:
+    # ISO 8601 como Timestamp.isoformat(), mas por coluna: fração de segundo
+    # só se a coluna tiver sub-segundos, offset só se a coluna tiver fuso.
+    local = ts.dt.tz_localize(None) if ts.dt.tz is not None else ts
+    arr = local.to_numpy(dtype="datetime64[ns]")
+    ns = arr.astype("int64")
+    if (ns % 1_000_000_000 == 0).all():
+        unit = "s"
+    elif (ns % 1_000 == 0).all():
+        unit = "us"
+    else:
+        unit = "ns"
+    iso = np.datetime_as_string(arr, unit=unit)
+    if ts.dt.tz is None:
+        return iso.tolist()
+    # Offset por linha (pode mudar no horário de verão); poucos valores distintos
+    utc = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+    offsets = (local - utc).dt.total_seconds().to_numpy(dtype="int64")
+    codes, uniques = pd.factorize(offsets)
+    suffixes = np.array([_format_utc_offset(int(o)) for o in uniques])
+    return np.char.add(iso, suffixes[codes]).tolist()
+
+def _series_records(out: pd.DataFrame) -> list[dict]:
+    # Conversão por coluna (sem iterrows): timestamps ISO + floats nativos
+    ts_iso = _iso_strings(out["timestamp"])
+    temps = out["temperature"].to_numpy(dtype=float).tolist()
+    return [{"timestamp": t, "temperature": v} for t, v in zip(ts_iso, temps)]
+
+def _hourly_means(out: pd.DataFrame) -> pd.DataFrame:
+    # Com fuso, to_numpy() converteria para UTC: as horas precisam seguir o
+    # relógio local (inclusive horário de verão), então fica com o resample.
+    if out["timestamp"].dt.tz is not None:
+        return out.set_index("timestamp").resample("1h").mean().dropna().reset_index()
+    # `out` já está ordenado por timestamp: cada hora é um bloco contíguo,
+    # então basta achar as fronteiras e somar cada bloco com reduceat.
+    hours = out["timestamp"].to_numpy().astype("datetime64[h]")
+    temps = out["temperature"].to_numpy(dtype=float)
+    starts = np.flatnonzero(np.r_[True, hours[1:] != hours[:-1]])
+    counts = np.diff(np.r_[starts, len(hours)])
+    means = np.add.reduceat(temps, starts) / counts
+    return pd.DataFrame({"timestamp": hours[starts].astype("datetime64[ns]"), "temperature": means})
+
 # --------------------- Endpoint ---------------------
-@app.post("/api/upload", response_model=UploadResponse)
+# Sem response_model: a série pode ter milhões de pontos e a validação
+# item a item do Pydantic custaria mais que o processamento. O schema
+# continua documentado no OpenAPI via `responses`.
+@app.post("/api/upload", response_class=ORJSONResponse, responses={200: {"model": UploadResponse}})
 async def upload(
     file: UploadFile = File(...),
     start: str | None = Form(None),
     end: str | None = Form(None),
 ):
-    content = await file.read()
-    df = _read_any_excel(content, file.filename)
+    # O Starlette já faz spool do upload (memória até 1 MiB, depois disco):
+    # o pandas lê direto desse arquivo, sem copiar tudo para um bytes.
+    df = _read_any_excel(file.file, file.filename)
 
     df = _normalize_columns(df)
-    df = df.dropna(axis=1, how="all").dropna(axis=0, how="all")
+    df = _drop_empty(df)
 
     if df.shape[1] < 2:
         raise HTTPException(status_code=400, detail=f"Planilha com poucas colunas. Colunas lidas: {df.columns.tolist()}")
 
     time_col, time2, ts_series = _pick_time_column(df)
-    temp_col = _pick_temp_column(df)
+    cleaned_cache: dict[str, pd.Series] = {}
+    temp_col = _pick_temp_column(df, cleaned_cache, exclude=(time_col, time2))
 
     ts = ts_series
     if time2 is not None and ts.dtype == "O":
-        d = pd.to_datetime(df[time_col], errors="coerce", dayfirst=True).dt.strftime("%Y-%m-%d")
-        h = pd.to_datetime(df[time2].astype(str), errors="coerce").dt.time.astype(str)
-        ts = pd.to_datetime(d + " " + h, errors="coerce")
+        ts = _combine_date_time(_parse_date_part(df[time_col]), _parse_time_part(df[time2]))
 
-    temp = _clean_numeric_series(df[temp_col])
+    temp = cleaned_cache.get(temp_col)
+    if temp is None:
+        temp = _clean_numeric_series(df[temp_col])
     temp = _final_sanity_trim(temp)
 
     out = pd.DataFrame({"timestamp": ts, "temperature": temp}).dropna(subset=["timestamp", "temperature"])
@@ -197,12 +396,31 @@ async def upload(
     if start or end:
         start_dt = pd.to_datetime(start, errors="coerce") if start else None
         end_dt = pd.to_datetime(end, errors="coerce") if end else None
-        mask = pd.Series(True, index=out.index)
-        if start_dt is not None:
-            mask &= out["timestamp"] >= start_dt
-        if end_dt is not None:
-            mask &= out["timestamp"] <= end_dt
-        out = out.loc[mask]
+        all_naive = out["timestamp"].dt.tz is None and all(
+            b is None or b.tzinfo is None for b in (start_dt, end_dt)
+        )
+        if all_naive:
+            # Comparação direta no array datetime64 (sem Series intermediárias)
+            ts_arr = out["timestamp"].to_numpy()
+            if start_dt is not None and end_dt is not None:
+                mask = (ts_arr >= start_dt.to_datetime64()) & (ts_arr <= end_dt.to_datetime64())
+            elif start_dt is not None:
+                mask = ts_arr >= start_dt.to_datetime64()
+            else:
+                mask = ts_arr <= end_dt.to_datetime64()
+            out = out.iloc[mask]
+        else:
+            # Com fuso (na coluna ou nos limites) o pandas compara os instantes
+            # e recusa misturar com/sem fuso; o array bruto perderia o fuso.
+            mask = pd.Series(True, index=out.index)
+            if start_dt is not None:
+                mask &= out["timestamp"] >= start_dt
+            if end_dt is not None:
+                mask &= out["timestamp"] <= end_dt
+            out = out.loc[mask]
+
+    # Dados originais (já filtrados)
+    data = _series_records(out)
 
     # Estatísticas (sobre o recorte filtrado, se houver)
     stats = {
@@ -210,38 +428,23 @@ async def upload(
         "max": float(out["temperature"].max()),
         "avg": float(out["temperature"].mean()),
         "count": int(out["temperature"].count()),
-        "start": out["timestamp"].iloc[0].isoformat(),
-        "end": out["timestamp"].iloc[-1].isoformat(),
+        "start": data[0]["timestamp"],
+        "end": data[-1]["timestamp"],
         "time_col": time_col if time2 is None else f"{time_col}+{time2}",
         "temp_col": temp_col,
     }
 
-    # Dados originais (já filtrados)
-    data = [
-        {"timestamp": row["timestamp"].isoformat(), "temperature": float(row["temperature"])}
-        for _, row in out.iterrows()
-    ]
-
     # >>> NOVO: Dados resumidos (a cada 1 hora)
-    out_resampled = (
-        out.set_index("timestamp")
-           .resample("1H")
-           .mean()
-           .dropna()
-           .reset_index()
-    )
-    resampled = [
-        {"timestamp": row["timestamp"].isoformat(), "temperature": float(row["temperature"])}
-        for _, row in out_resampled.iterrows()
-    ]
-
-    return {
+    out_resampled = _hourly_means(out)
+    resampled = _series_records(out_resampled)
+
+    return ORJSONResponse({
         "time_key": "timestamp",
         "temp_key": "temperature",
         "data": data,
         "resampled": resampled,
         "stats": stats,
-    }
+    })
 
 @app.get("/health")
 async def health():